@@ -23,6 +23,18 @@ if ! python -c "import telegram" 2>/dev/null; then
     pip install python-telegram-bot python-dotenv
 fi
 
+# Check if numpy is installed (required for image processing)
+if ! python -c "import numpy" 2>/dev/null; then
+    echo "Installing numpy..."
+    pip install numpy
+fi
+
+# Check if numba is installed (optional, speeds up dithering)
+if ! python -c "import numba" 2>/dev/null; then
+    echo "Installing numba (optional)..."
+    pip install numba || echo "numba not installed, falling back to Pillow dithering"
+fi
+
 # Start the Telegram bot
 echo "Starting Telegram bot for e-ink display..."
 python telegram_bot.py
\ No newline at end of file
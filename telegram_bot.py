@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
+import asyncio
 import os
+import re
+from functools import lru_cache, partial
 from io import BytesIO
 from telegram import Update, Bot
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
@@ -8,10 +11,22 @@ import busio
 import digitalio
 from adafruit_epd.epd import Adafruit_EPD
 from adafruit_epd.uc8179 import Adafruit_UC8179
-from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageOps
 from dotenv import load_dotenv
 from loguru import logger
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # numba is optional; without it Pillow's quantizer does the dithering
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when numba is not installed."""
+        return lambda func: func
+
 # Load environment variables
 load_dotenv()
 
@@ -26,6 +41,10 @@ DC_PIN    = board.PI4   # DC, physical pin 38
 RESET_PIN = board.PI16  # RST, physical pin 37
 BUSY_PIN = board.PH4
 
+# --- SPI clock ---
+# Adafruit_EPD configures 1 MHz; the UC8179 accepts a much faster clock
+SPI_BAUDRATE = 10_000_000
+
 # --- Display configuration ---
 DISPLAY = {"WIDTH": 800, "HEIGHT": 480, "rotation": 0}
 
@@ -34,12 +53,35 @@ FONT = "/home/orangepi/develop/eink_bot/fonts/Inter.ttf"
 EMOJI_FONT = "/home/orangepi/develop/eink_bot/fonts/NotoEmoji.ttf"
 MAX_FONT_SIZE = 350
 
+# --- Color markup ---
+_RED_RE = re.compile(r'RED\{([^}]*)\}')
+
+# --- Tri-color palette ---
+# We map the 256 palette indices to our 3 colors
+# 0-63: Black, 64-126: Red, 127-255: White
+_TRI_PALETTE_BYTES = np.stack([
+    np.where(np.arange(256) < 64, 0, 255),    # R
+    np.where(np.arange(256) < 127, 0, 255),   # G
+    np.where(np.arange(256) < 127, 0, 255),   # B
+], axis=1).astype(np.uint8).tobytes()
+
+# Palette image used for quantization, built once at import time
+_PALETTE_IMG = Image.new("P", (1, 1))
+_PALETTE_IMG.putpalette(_TRI_PALETTE_BYTES)
+
+# Indices into _TRI_PALETTE_BYTES for black, red and white, as chosen
+# by the JIT dithering kernel
+_TRI_INDICES = np.array([0, 64, 255], dtype=np.uint8)
+
 # Global display object
 display = None
 
 # Global debug mode flag
 debug_mode = True
 
+# Serializes access to the e-ink panel between concurrent handlers
+display_lock = asyncio.Lock()
+
 def init_display():
     """Initialize the e-ink display"""
     global display
@@ -66,6 +108,12 @@ def init_display():
             tri_color=True
         )
 
+        # Raise the SPI clock after the driver has set its 1 MHz default
+        while not spi.try_lock():
+            pass
+        spi.configure(baudrate=SPI_BAUDRATE, phase=0, polarity=0)
+        spi.unlock()
+
         display.rotation = 2
         logger.info("Display initialized successfully")
         return True
@@ -73,80 +121,225 @@ def init_display():
         logger.error(f"Failed to initialize display: {e}")
         return False
 
-def process_and_display_image(image_data):
-    """Process and display image on e-ink display"""
+@njit(cache=True, boundscheck=False, nogil=True)
+def render_tri(arr_u8, flip, black_inverted, color_inverted):
+    """Floyd-Steinberg dither an (H, W, 3) uint8 RGB array and pack the bitplanes.
+
+    Dithering, palette mapping and bit packing happen in a single sweep,
+    carrying the diffused error in two row buffers. Returns (indices,
+    black_plane, red_plane): indices is an (H, W) map into _TRI_PALETTE_BYTES
+    and the planes are MHMSB-packed in panel orientation (rotated 180
+    degrees when flip is set), ready for the driver's framebuffers.
+    """
+    height, width, _ = arr_u8.shape
+    row_bytes = width // 8
+    indices = np.empty((height, width), dtype=np.uint8)
+    black_plane = np.zeros(height * row_bytes, dtype=np.uint8)
+    red_plane = np.zeros(height * row_bytes, dtype=np.uint8)
+
+    # Error for the current and next row, padded by one pixel on each side
+    err_cur = np.zeros((width + 2, 3), dtype=np.float32)
+    err_next = np.zeros((width + 2, 3), dtype=np.float32)
+
+    for y in range(height):
+        for x in range(width):
+            # Clamp the accumulated value so errors can't run away
+            r = min(max(arr_u8[y, x, 0] + err_cur[x + 1, 0], 0.0), 255.0)
+            g = min(max(arr_u8[y, x, 1] + err_cur[x + 1, 1], 0.0), 255.0)
+            b = min(max(arr_u8[y, x, 2] + err_cur[x + 1, 2], 0.0), 255.0)
+
+            # Pick the nearest display color by squared distance; for black,
+            # red and white that reduces to threshold tests on the channels
+            if r <= 127.5 and r + g + b <= 382.5:
+                best = 0  # black
+                err_r = r
+                err_g = g
+                err_b = b
+            elif g + b <= 255.0:
+                best = 1  # red
+                err_r = r - 255.0
+                err_g = g
+                err_b = b
+            else:
+                best = 2  # white
+                err_r = r - 255.0
+                err_g = g - 255.0
+                err_b = b - 255.0
+
+            # Spread the error to the right and to the row below
+            err_cur[x + 2, 0] += err_r * 7.0 / 16.0
+            err_cur[x + 2, 1] += err_g * 7.0 / 16.0
+            err_cur[x + 2, 2] += err_b * 7.0 / 16.0
+            err_next[x, 0] += err_r * 3.0 / 16.0
+            err_next[x, 1] += err_g * 3.0 / 16.0
+            err_next[x, 2] += err_b * 3.0 / 16.0
+            err_next[x + 1, 0] += err_r * 5.0 / 16.0
+            err_next[x + 1, 1] += err_g * 5.0 / 16.0
+            err_next[x + 1, 2] += err_b * 5.0 / 16.0
+            err_next[x + 2, 0] += err_r * 1.0 / 16.0
+            err_next[x + 2, 1] += err_g * 1.0 / 16.0
+            err_next[x + 2, 2] += err_b * 1.0 / 16.0
+
+            indices[y, x] = _TRI_INDICES[best]
+
+            # Set the pixel's bits in panel orientation
+            px = width - 1 - x if flip else x
+            py = height - 1 - y if flip else y
+            offset = py * row_bytes + px // 8
+            mask = np.uint8(0x80 >> (px & 7))
+            if (best == 0) != black_inverted:
+                black_plane[offset] |= mask
+            if (best == 1) != color_inverted:
+                red_plane[offset] |= mask
+
+        err_cur, err_next = err_next, err_cur
+        err_next[:] = 0.0
+
+    return indices, black_plane, red_plane
+
+def warm_up_dither():
+    """Compile render_tri ahead of the first photo (no-op without numba).
+
+    The array comes from a PIL image like in process_and_display_image, so
+    the compiled signature (read-only uint8 array) is the one used later.
+    """
+    if not NUMBA_AVAILABLE:
+        return
+    try:
+        render_tri(np.asarray(Image.new("RGB", (8, 8))), False, False, False)
+        logger.info("Dithering kernel compiled")
+    except Exception as e:
+        logger.error(f"Failed to compile dithering kernel: {e}")
+
+def can_blit():
+    """Check whether the display buffers can be written as packed bitplanes.
+
+    SRAM-backed buffers, 90/270 degree rotation and monochrome panels need
+    the driver's own display.image() path.
+    """
+    return not (display.sram or display.rotation not in (0, 2) or display.width % 8
+                or display._blackframebuf is display._colorframebuf)
+
+def write_planes(black_plane, red_plane):
+    """Copy packed black and red bitplanes into the driver's framebuffers."""
+    display._blackframebuf.buf[:] = black_plane.tobytes()
+    display._colorframebuf.buf[:] = red_plane.tobytes()
+
+def blit_image(image):
+    """Load an RGB image, or a P image using _TRI_PALETTE_BYTES, into the display buffers.
+
+    Classifies pixels with the same thresholds as Adafruit_EPD.image() (or
+    by palette index for P images, one byte per pixel instead of three), but
+    packs the black and red bitplanes with numpy and copies them into the
+    driver's framebuffers in one go instead of setting pixels one by one.
+    Falls back to display.image() when can_blit() says the layout can't be
+    packed directly.
+    """
+    if not can_blit():
+        display.image(image.convert("RGB") if image.mode == "P" else image)
+        return
+
+    pixels = np.asarray(image)
+    if image.mode == "P":
+        # 0-63: Black, 64-126: Red, 127-255: White
+        black = pixels < 64
+        red = ~black & (pixels < 127)
+    else:
+        dark_r = pixels[..., 0] < 0x80
+        dark_g = pixels[..., 1] < 0x80
+        dark_b = pixels[..., 2] < 0x80
+        red = ~dark_r & dark_g & dark_b
+        black = dark_r & dark_g & dark_b
+
+    # The framebuffers are in panel orientation; rotation 2 is a 180 degree flip
+    if display.rotation == 2:
+        red = red[::-1, ::-1]
+        black = black[::-1, ::-1]
+
+    # MHMSB layout: rows of width // 8 bytes, most significant bit first
+    write_planes(
+        np.packbits(black != display._black_inverted, axis=-1),
+        np.packbits(red != display._color_inverted, axis=-1),
+    )
+
+def process_and_display_image(image_data, return_image=False):
+    """Process and display image on e-ink display.
+
+    image_data is a binary file-like object such as BytesIO. Returns a
+    (success, image) tuple; image is the final dithered image when
+    return_image is True, otherwise None.
+    """
     global display
     if display is None:
         logger.error("Display not initialized")
-        return False
+        return False, None
 
     try:
-        # Open image from bytes
-        image = Image.open(BytesIO(image_data))
+        # Open image straight from the file-like object
+        image = Image.open(image_data)
 
         # Convert to RGB if necessary
         if image.mode != 'RGB':
             image = image.convert('RGB')
 
-        # Scale the image to the smaller screen dimension
-        image_ratio = image.width / image.height
-        screen_ratio = display.width / display.height
-        if screen_ratio < image_ratio:
-            scaled_width = image.width * display.height // image.height
-            scaled_height = display.height
+        # Scale to cover the screen and crop the center in one resampling pass;
+        # bilinear is fast and sufficient for downscales that get dithered anyway,
+        # keep Lanczos for the rare upscale of small images
+        size = (display.width, display.height)
+        upscale = image.width < display.width or image.height < display.height
+        resample = Image.LANCZOS if upscale else Image.BILINEAR
+        image = ImageOps.fit(image, size, method=resample, centering=(0.5, 0.5))
+
+        # No fill needed: every pixel of both bitplanes is written below
+        if NUMBA_AVAILABLE and can_blit():
+            # Dither and pack the bitplanes in one JIT-compiled sweep
+            indices, black_plane, red_plane = render_tri(
+                np.asarray(image),
+                display.rotation == 2,
+                display._black_inverted,
+                display._color_inverted,
+            )
+            write_planes(black_plane, red_plane)
+
+            if return_image:
+                image = Image.fromarray(indices, "P")
+                image.putpalette(_TRI_PALETTE_BYTES)
         else:
-            scaled_width = display.width
-            scaled_height = image.height * display.width // image.width
-        image = image.resize((scaled_width, scaled_height), Image.BICUBIC)
-
-        # Crop and center the image
-        x = scaled_width // 2 - display.width // 2
-        y = scaled_height // 2 - display.height // 2
-        image = image.crop((x, y, x + display.width, y + display.height)).convert("RGB")
-
-        # Create palette for tri-color display
-        palette = []
-        # We'll map the 256 palette indices to our 3 colors
-        # 0-63: Black, 64-127: Red, 128-255: White
-        for i in range(256):
-            if i < 64:
-                palette.extend([0, 0, 0])  # Black
-            elif i < 127:
-                palette.extend([255, 0, 0])  # Red
-            else:
-                palette.extend([255, 255, 255])  # White
+            # Quantize the image using Floyd-Steinberg dithering; blit_image
+            # reads the palette indices directly, so it stays in mode "P"
+            image = image.quantize(palette=_PALETTE_IMG, dither=Image.FLOYDSTEINBERG)
+            blit_image(image)
 
-        # Create a palette image
-        palette_img = Image.new("P", (1, 1))
-        palette_img.putpalette(palette)
-
-        # Quantize the image using Floyd-Steinberg dithering
-        image = image.quantize(palette=palette_img, dither=Image.FLOYDSTEINBERG)
-
-        # Convert back to RGB for the display driver
-        image = image.convert("RGB")
-
-        # Clear the buffer and display the image
-        display.fill(Adafruit_EPD.WHITE)
-        display.image(image)
+        # Display the image
         display.display()
 
         logger.info("Image displayed successfully")
-        return True
+        return True, image if return_image else None
 
     except Exception as e:
         logger.error(f"Failed to process image: {e}")
-        return False
+        return False, None
+
+@lru_cache(maxsize=128)
+def _get_font(path, size):
+    """Load a TrueType font, reusing the parsed face for repeated sizes."""
+    return ImageFont.truetype(path, size)
+
+@lru_cache(maxsize=8192)
+def _text_bbox(font, text):
+    """Measure text with font.getbbox, memoized per (font, text).
+
+    Fonts come from _get_font, so the same object is reused for a given
+    size and repeated probes during wrapping and sizing hit the cache.
+    """
+    return font.getbbox(text)
 
 def parse_colored_text(text):
     """Parse text with RED{...} syntax and return list of (text, color) tuples."""
-    import re
-
     parts = []
     current_pos = 0
-    pattern = r'RED\{(.*?)\}'
 
-    for match in re.finditer(pattern, text):
+    for match in _RED_RE.finditer(text):
         # Add text before RED{...} in black
         if match.start() > current_pos:
             black_text = text[current_pos:match.start()]
@@ -170,25 +363,40 @@ def parse_colored_text(text):
 
 def wrap_text_mixed(text, font_size, max_width):
     """Wrap text using mixed font measurement to fit within max_width, preserving word boundaries."""
+    # Width of the space between two words, measured the same way as words
+    space_width = get_mixed_text_size("x x", font_size)[0] - get_mixed_text_size("xx", font_size)[0]
+
     words = text.split(' ')
     lines = []
     current_line = ""
-    for i, word in enumerate(words):
-        # Test if adding this word would exceed the line width
-        test_line = current_line + (' ' if current_line else '') + word
-        test_width, _ = get_mixed_text_size(test_line, font_size)
+    current_width = 0
+    for word in words:
+        # Test if adding this word would exceed the line width; only the new
+        # word is measured and added to the running width of the line
+        word_width, _ = get_mixed_text_size(word, font_size)
+        if current_line:
+            test_width = current_width + space_width + word_width
+            # Summed widths are off by the glyph side bearings at word edges,
+            # so measure the whole candidate line when it's close to the limit
+            if test_width > max_width - font_size // 2:
+                test_width, _ = get_mixed_text_size(current_line + ' ' + word, font_size)
+        else:
+            test_width = word_width
 
         if test_width <= max_width:
-            current_line = test_line
+            current_line = current_line + ' ' + word if current_line else word
+            current_width = test_width
         else:
             # If current line is not empty, add it to lines and start new line
             if current_line:
                 lines.append(current_line)
                 current_line = word
+                current_width = word_width
             else:
                 # Single word is too long, add it anyway (will be truncated)
                 lines.append(word)
                 current_line = ""
+                current_width = 0
 
     # Add the last line if it's not empty
     if current_line:
@@ -196,78 +404,121 @@ def wrap_text_mixed(text, font_size, max_width):
 
     return lines
 
+def _text_width(font, text):
+    """Width of the text's bounding box."""
+    bbox = _text_bbox(font, text)
+    return bbox[2] - bbox[0]
+
 def wrap_text(text, font, max_width):
-    """Wrap text to fit within max_width using word boundaries."""
-    import textwrap
+    """Wrap text to fit within max_width using word boundaries.
 
-    # Use Python's textwrap for better word handling
-    wrapper = textwrap.TextWrapper(width=max_width)
+    Not used by /text, which wraps with wrap_text_mixed (and does not break
+    overlong words).
+    """
+    # We need to check actual text width since characters have different widths;
+    # the line width is kept as a running sum of word widths and spaces
+    space_width = _text_width(font, "x x") - _text_width(font, "xx")
 
-    # But we need to check actual text width since characters have different widths
     words = text.split()
     lines = []
-    current_line = []
+    current_line = ""
+    current_width = 0
 
     for word in words:
-        # Test if adding this word exceeds the width
+        # Test if adding this word exceeds the width, measuring only the word
+        word_width = _text_width(font, word)
         if current_line:
-            test_line = ' '.join(current_line + [word])
+            test_width = current_width + space_width + word_width
+            # Summed widths are off by the glyph side bearings at word edges,
+            # so measure the whole candidate line when it's close to the limit
+            if test_width > max_width - font.size // 2:
+                test_width = _text_width(font, current_line + ' ' + word)
         else:
-            test_line = word
-
-        bbox = font.getbbox(test_line)
-        test_width = bbox[2] - bbox[0]
+            test_width = word_width
 
         if test_width <= max_width:
-            current_line.append(word)
+            current_line = current_line + ' ' + word if current_line else word
+            current_width = test_width
         else:
             # If current line has content, add it and start new line
             if current_line:
-                lines.append(' '.join(current_line))
-                current_line = [word]
+                lines.append(current_line)
+                current_line = word
+                current_width = word_width
             else:
                 # Single word is too long, try to break it character by character
                 if len(word) > 1:
-                    # Try to find the longest prefix that fits
-                    best_prefix = ""
-                    for i in range(1, len(word) + 1):
-                        test_prefix = word[:i]
-                        bbox = font.getbbox(test_prefix)
-                        if bbox[2] - bbox[0] <= max_width:
-                            best_prefix = test_prefix
+                    # Binary search for the longest prefix that fits
+                    # (width grows monotonically with prefix length)
+                    lo, hi = 0, len(word)
+                    while lo < hi:
+                        mid = (lo + hi + 1) // 2
+                        if _text_width(font, word[:mid]) <= max_width:
+                            lo = mid
                         else:
-                            break
+                            hi = mid - 1
+                    best_prefix = word[:lo]
 
                     if best_prefix:
                         lines.append(best_prefix)
-                        current_line = [word[len(best_prefix):]]
+                        current_line = word[len(best_prefix):]
                     else:
                         lines.append(word[0])  # At least one character
-                        current_line = [word[1:]]
+                        current_line = word[1:]
+                    current_width = _text_width(font, current_line)
                 else:
                     lines.append(word)
 
     # Add the last line
     if current_line:
-        lines.append(' '.join(current_line))
+        lines.append(current_line)
 
     return lines
 
+def layout_text(text, font_size, max_width, font_path=FONT):
+    """Wrap text at a font size and measure its uniform line height.
+
+    Returns a (font_size, font, wrapped_lines, uniform_line_height) layout,
+    where wrapped_lines are the (text, color) parts of each line as produced
+    by generate_wrapped_colored_text.
+    """
+    # Try to load a font, fallback to default if not available
+    try:
+        font = _get_font(font_path, font_size)
+    except:
+        try:
+            logger.warning(f'ERROR TO LOAD INTER FONT WITH SIZE {font_size}!')
+            font = ImageFont.load_default()
+        except:
+            logger.error('ERROR TO LOAD DEFAULT FONT!')
+            font = ImageFont.load_default()
+
+    # Generate wrapped colored text lines
+    wrapped_lines = generate_wrapped_colored_text(text, font, max_width)
+
+    # Calculate uniform line height using mixed fonts
+    _, uniform_line_height = get_mixed_text_size("Ay", font_size)
+
+    return font_size, font, wrapped_lines, uniform_line_height
+
 def find_font_size(text, max_width, max_height, font_path):
-    """Find optimal font size for text, considering text wrapping with mixed fonts."""
-    fontsize = 10
-    best_size = 10
+    """Find optimal font size for text, considering text wrapping with mixed fonts.
 
-    while True:
-        # Calculate uniform line height using mixed fonts
-        _, uniform_line_height = get_mixed_text_size("Ay", fontsize)
+    Returns the layout (see layout_text) for the chosen size, so rendering can
+    reuse the wrapped lines instead of wrapping the text again.
+    """
+    layouts = {}
 
-        # Try to wrap the text using mixed font measurement
-        lines = wrap_text_mixed(text, fontsize, max_width)
+    def _fits(fontsize):
+        """Check whether text wrapped at this font size fits the given box."""
+        layout = layout_text(text, fontsize, max_width, font_path)
+        layouts[fontsize] = layout
+        _, _, lines, uniform_line_height = layout
 
         # Check if any wrapped lines exceed the maximum width
         max_line_width = 0
-        for line in lines:
+        for line_parts in lines:
+            line = ''.join(part_text for part_text, _ in line_parts)
             line_width, _ = get_mixed_text_size(line, fontsize)
             max_line_width = max(max_line_width, line_width)
 
@@ -283,21 +534,41 @@ def find_font_size(text, max_width, max_height, font_path):
         total_height = int(total_height * 1.1)
 
         # Check if it fits both width and height constraints
-        if total_height > max_height or max_line_width > max_width:
-            return best_size  # Return previous successful size
+        return total_height <= max_height and max_line_width <= max_width
 
-        best_size = fontsize
-        fontsize += 1
+    # Fit is monotonic in font size: double the size until it stops fitting
+    # (or hits the ceiling), then binary-search between the last two probes
+    best_size = 10
+    if not _fits(best_size):
+        return layouts[best_size]
 
-        # Prevent infinite loop
-        if fontsize > MAX_FONT_SIZE:
-            break
+    fontsize = best_size * 2
+    while fontsize <= MAX_FONT_SIZE and _fits(fontsize):
+        best_size = fontsize
+        fontsize *= 2
+
+    if fontsize > MAX_FONT_SIZE:
+        if _fits(MAX_FONT_SIZE):
+            return layouts[MAX_FONT_SIZE]
+        fontsize = MAX_FONT_SIZE
+
+    # Invariant: best_size fits, fontsize does not
+    while best_size + 1 < fontsize:
+        mid = (best_size + fontsize) // 2
+        if _fits(mid):
+            best_size = mid
+        else:
+            fontsize = mid
 
-    return best_size
+    return layouts[best_size]
 
 def generate_wrapped_colored_text(text, font, max_width):
     """Generate wrapped text lines with color information preserved."""
 
+    # Plain text needs no color mapping: every wrapped line is black
+    if 'RED{' not in text:
+        return [[(line, 'BLACK')] for line in wrap_text_mixed(text, font.size, max_width)]
+
     # First, parse the colored text parts
     text_parts = parse_colored_text(text)
 
@@ -428,17 +699,17 @@ def get_mixed_text_size(text, font_size):
     """Calculate text size using mixed fonts (Inter for text, Noto Color Emoji for emojis)."""
     try:
         # Load both fonts
-        text_font = ImageFont.truetype(FONT, font_size)
-        emoji_font = ImageFont.truetype(EMOJI_FONT, font_size)
+        text_font = _get_font(FONT, font_size)
+        emoji_font = _get_font(EMOJI_FONT, font_size)
     except Exception as e:
         logger.warning(f"  Size calculation font error: {e}")
         # Fallback to Inter font only
         try:
-            font = ImageFont.truetype(FONT, font_size)
+            font = _get_font(FONT, font_size)
         except:
             font = ImageFont.load_default()
         try:
-            bbox = font.getbbox(text)
+            bbox = _text_bbox(font, text)
             return bbox[2] - bbox[0], bbox[3] - bbox[1]
         except:
             try:
@@ -460,7 +731,7 @@ def get_mixed_text_size(text, font_size):
             font = text_font
 
         try:
-            bbox = font.getbbox(segment_text)
+            bbox = _text_bbox(font, segment_text)
             segment_width = bbox[2] - bbox[0]
             segment_height = bbox[3] - bbox[1]
         except:
@@ -489,14 +760,14 @@ def draw_mixed_text(draw, position, text, font_size, color=(0, 0, 0)):
 
     try:
         # Load both fonts
-        text_font = ImageFont.truetype(FONT, font_size)
-        emoji_font = ImageFont.truetype(EMOJI_FONT, font_size)
+        text_font = _get_font(FONT, font_size)
+        emoji_font = _get_font(EMOJI_FONT, font_size)
         logger.debug(f"  Fonts loaded successfully: Inter and Noto Color Emoji at size {font_size}")
     except Exception as e:
         logger.warning(f"Font loading error: {e}")
         # Fallback to Inter font only
         try:
-            text_font = ImageFont.truetype(FONT, font_size)
+            text_font = _get_font(FONT, font_size)
         except:
             text_font = ImageFont.load_default()
         emoji_font = text_font  # Use same font as fallback
@@ -530,7 +801,7 @@ def draw_mixed_text(draw, position, text, font_size, color=(0, 0, 0)):
 
         # Calculate segment width for positioning
         try:
-            bbox = font.getbbox(segment_text)
+            bbox = _text_bbox(font, segment_text)
             segment_width = bbox[2] - bbox[0]
         except:
             # Fallback method
@@ -551,38 +822,28 @@ def generate_text_image(text, font_size=30):
         logger.error("Display not initialized")
         return None
 
+    try:
+        max_text_width = display.width - 40  # 20px padding on each side
+        layout = layout_text(text, font_size, max_text_width)
+    except Exception as e:
+        logger.error(f"Failed to generate text image: {e}")
+        return None
+
+    return generate_text_image_from_layout(*layout)
+
+def generate_text_image_from_layout(font_size, font, wrapped_lines, uniform_line_height):
+    """Render an already wrapped text layout (see layout_text) centered on a white image."""
+    if display is None:
+        logger.error("Display not initialized")
+        return None
+
     try:
         # Create a white background image for e-ink display
         image = Image.new("RGB", (display.width, display.height), (255, 255, 255))
         draw = ImageDraw.Draw(image)
 
-        # Try to load a font, fallback to default if not available
-        try:
-            font = ImageFont.truetype(FONT, font_size)
-        except:
-            try:
-                logger.warning(f'ERROR TO LOAD INTER FONT WITH SIZE {font_size}!')
-                font = ImageFont.load_default()
-            except:
-                logger.error('ERROR TO LOAD DEFAULT FONT!')
-                font = ImageFont.load_default()
-
-        # Generate wrapped colored text lines
-        max_text_width = display.width - 40  # 20px padding on each side
-        wrapped_lines = generate_wrapped_colored_text(text, font, max_text_width)
-
         logger.debug(f"DEBUG WRAPPED LINES: {wrapped_lines}")
 
-        # Calculate uniform line height based on font metrics
-        try:
-            # Get a sample text to determine consistent line height
-            sample_bbox = font.getbbox("Ay")
-            uniform_line_height = sample_bbox[3] - sample_bbox[1]
-        except:
-            # Fallback for older PIL versions
-            _, uniform_line_height = draw.textsize("Ay", font=font)
-            uniform_line_height = int(uniform_line_height)
-
         # Calculate line widths (use uniform height)
         line_widths = []
 
@@ -653,32 +914,55 @@ def generate_text_image(text, font_size=30):
         logger.error(f"Failed to generate text image: {e}")
         return None
 
-def display_text(text, font_size=30):
-    """Display text on the e-ink display."""
+def display_text(text, font_size=30, layout=None, return_image=False):
+    """Display text on the e-ink display.
+
+    If layout (as returned by find_font_size) is given, it is rendered
+    as is instead of wrapping the text again. Returns a (success, image)
+    tuple; image is the rendered text image when return_image is True,
+    otherwise None.
+    """
     global display
     if display is None:
         logger.error("Display not initialized")
-        return False
+        return False, None
 
     try:
         # Generate the text image
-        image = generate_text_image(text, font_size)
+        if layout is not None:
+            image = generate_text_image_from_layout(*layout)
+        else:
+            image = generate_text_image(text, font_size)
         if image is None:
-            return False
+            return False, None
 
-        # Clear the display first to ensure a clean white background
-        display.fill(Adafruit_EPD.WHITE)
-
-        # Display the image
-        display.image(image)
+        # Display the image; it already has a white background and
+        # overwrites the whole buffer, so no fill is needed first
+        blit_image(image)
         display.display()
 
         logger.info(f"Text displayed successfully: '{text}' with font size {font_size}")
-        return True
+        return True, image if return_image else None
 
     except Exception as e:
         logger.error(f"Failed to display text: {e}")
-        return False
+        return False, None
+
+def encode_debug_image(image):
+    """Encode a rendered image as PNG for sending back in debug mode.
+
+    Dithered images stay in mode "P", which keeps the dither pattern exact
+    and encodes much smaller and faster than an RGB copy.
+    """
+    img_byte_arr = BytesIO()
+    image.save(img_byte_arr, format='PNG')
+    img_byte_arr.seek(0)
+    return img_byte_arr
+
+async def run_blocking(func, *args, **kwargs):
+    """Run blocking work in the default executor so the event loop stays responsive."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a message when the command /start is issued."""
@@ -719,8 +1003,9 @@ async def clear_display(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         return
 
     try:
-        display.fill(Adafruit_EPD.WHITE)
-        display.display()
+        async with display_lock:
+            await run_blocking(display.fill, Adafruit_EPD.WHITE)
+            await run_blocking(display.display)
         await update.message.reply_text("Display cleared!")
         logger.info("Display cleared")
     except Exception as e:
@@ -752,22 +1037,29 @@ async def text_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     # Join remaining arguments to form the complete message
     text_message = " ".join(text_args)
 
-    # Auto-calculate font size if not provided
+    # Auto-calculate font size if not provided; the layout found for it
+    # is reused for rendering
+    layout = None
     if auto_sized or font_size is None:
         try:
-            # Remove RED{...} tags for accurate text measurement
-            clean_text = text_message.replace("RED{", "").replace("}", "")
-            logger.debug(f'RECEIVED TEXT: "{clean_text}"')
-            font_size = find_font_size(clean_text, display.width - 40, display.height - 40, FONT)
+            logger.debug(f'RECEIVED TEXT: "{text_message}"')
+            layout = await run_blocking(find_font_size, text_message, display.width - 40, display.height - 40, FONT)
+            font_size = layout[0]
             auto_sized = True
             logger.info(f"Auto-calculated font size: {font_size} for text: '{text_message}'")
         except Exception as e:
             logger.error(f"Failed to auto-calculate font size: {e}")
             font_size = 30  # fallback to default
+            layout = None
             auto_sized = False
 
     # Display the text
-    if display_text(text_message, font_size):
+    async with display_lock:
+        success, image = await run_blocking(
+            display_text, text_message, font_size, layout=layout, return_image=debug_mode
+        )
+
+    if success:
         if auto_sized:
             font_info = f" (auto font size: {font_size})"
         elif font_size != 30:
@@ -777,19 +1069,10 @@ async def text_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
         await update.message.reply_text(f"Text displayed on e-ink screen: '{text_message}'{font_info}")
 
-        if debug_mode:
+        if image is not None:
             # Send the rendered text image back to user in debug mode
             try:
-                # Generate the text image using the new function
-                image = generate_text_image(text_message, font_size)
-                if image is not None:
-                    # Convert to bytes for sending
-                    img_byte_arr = BytesIO()
-                    image.save(img_byte_arr, format='PNG')
-                    img_byte_arr.seek(0)
-                    await update.message.reply_photo(photo=img_byte_arr)
-                else:
-                    logger.error("Failed to generate text image for debug mode")
+                await update.message.reply_photo(photo=await run_blocking(encode_debug_image, image))
             except Exception as e:
                 logger.error(f"Failed to send debug text image: {e}")
     else:
@@ -815,61 +1098,19 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     try:
         # Download the photo
         file = await context.bot.get_file(photo.file_id)
-        photo_bytes = await file.download_as_bytearray()
+        photo_buffer = BytesIO()
+        await file.download_to_memory(photo_buffer)
+        photo_buffer.seek(0)
 
         # Display the image
-        if process_and_display_image(photo_bytes):
+        async with display_lock:
+            success, image = await run_blocking(process_and_display_image, photo_buffer, return_image=debug_mode)
+        if success:
             await update.message.reply_text("Photo displayed on e-ink screen!")
-            if debug_mode:
+            if image is not None:
                 # Send the processed image back to user in debug mode
                 try:
-                    # Recreate the final image for sending
-                    image = Image.open(BytesIO(photo_bytes))
-
-                    # Convert to RGB if necessary
-                    if image.mode != 'RGB':
-                        image = image.convert('RGB')
-
-                    # Scale the image to the smaller screen dimension
-                    image_ratio = image.width / image.height
-                    screen_ratio = display.width / display.height
-                    if screen_ratio < image_ratio:
-                        scaled_width = image.width * display.height // image.height
-                        scaled_height = display.height
-                    else:
-                        scaled_width = display.width
-                        scaled_height = image.height * display.width // image.width
-                    image = image.resize((scaled_width, scaled_height), Image.BICUBIC)
-
-                    # Crop and center the image
-                    x = scaled_width // 2 - display.width // 2
-                    y = scaled_height // 2 - display.height // 2
-                    image = image.crop((x, y, x + display.width, y + display.height)).convert("RGB")
-
-                    # Create palette for tri-color display
-                    palette = []
-                    for i in range(256):
-                        if i < 64:
-                            palette.extend([0, 0, 0])  # Black
-                        elif i < 127:
-                            palette.extend([255, 0, 0])  # Red
-                        else:
-                            palette.extend([255, 255, 255])  # White
-
-                    # Create a palette image
-                    palette_img = Image.new("P", (1, 1))
-                    palette_img.putpalette(palette)
-
-                    # Quantize the image using Floyd-Steinberg dithering
-                    image = image.quantize(palette=palette_img, dither=Image.FLOYDSTEINBERG)
-                    image = image.convert("RGB")
-
-                    # Convert to bytes for sending
-                    img_byte_arr = BytesIO()
-                    image.save(img_byte_arr, format='PNG')
-                    img_byte_arr.seek(0)
-
-                    await update.message.reply_photo(photo=img_byte_arr)
+                    await update.message.reply_photo(photo=await run_blocking(encode_debug_image, image))
                 except Exception as e:
                     logger.error(f"Failed to send debug image: {e}")
         else:
@@ -891,61 +1132,19 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     try:
         # Download the document
         file = await context.bot.get_file(update.message.document.file_id)
-        file_bytes = await file.download_as_bytearray()
+        file_buffer = BytesIO()
+        await file.download_to_memory(file_buffer)
+        file_buffer.seek(0)
 
         # Display the image
-        if process_and_display_image(file_bytes):
+        async with display_lock:
+            success, image = await run_blocking(process_and_display_image, file_buffer, return_image=debug_mode)
+        if success:
             await update.message.reply_text("Image displayed on e-ink screen!")
-            if debug_mode:
+            if image is not None:
                 # Send the processed image back to user in debug mode
                 try:
-                    # Recreate the final image for sending
-                    image = Image.open(BytesIO(file_bytes))
-
-                    # Convert to RGB if necessary
-                    if image.mode != 'RGB':
-                        image = image.convert('RGB')
-
-                    # Scale the image to the smaller screen dimension
-                    image_ratio = image.width / image.height
-                    screen_ratio = display.width / display.height
-                    if screen_ratio < image_ratio:
-                        scaled_width = image.width * display.height // image.height
-                        scaled_height = display.height
-                    else:
-                        scaled_width = display.width
-                        scaled_height = image.height * display.width // image.width
-                    image = image.resize((scaled_width, scaled_height), Image.BICUBIC)
-
-                    # Crop and center the image
-                    x = scaled_width // 2 - display.width // 2
-                    y = scaled_height // 2 - display.height // 2
-                    image = image.crop((x, y, x + display.width, y + display.height)).convert("RGB")
-
-                    # Create palette for tri-color display
-                    palette = []
-                    for i in range(256):
-                        if i < 64:
-                            palette.extend([0, 0, 0])  # Black
-                        elif i < 127:
-                            palette.extend([255, 0, 0])  # Red
-                        else:
-                            palette.extend([255, 255, 255])  # White
-
-                    # Create a palette image
-                    palette_img = Image.new("P", (1, 1))
-                    palette_img.putpalette(palette)
-
-                    # Quantize the image using Floyd-Steinberg dithering
-                    image = image.quantize(palette=palette_img, dither=Image.FLOYDSTEINBERG)
-                    image = image.convert("RGB")
-
-                    # Convert to bytes for sending
-                    img_byte_arr = BytesIO()
-                    image.save(img_byte_arr, format='PNG')
-                    img_byte_arr.seek(0)
-
-                    await update.message.reply_photo(photo=img_byte_arr)
+                    await update.message.reply_photo(photo=await run_blocking(encode_debug_image, image))
                 except Exception as e:
                     logger.error(f"Failed to send debug image: {e}")
         else:
@@ -973,8 +1172,12 @@ def main():
     if not init_display():
         logger.error("Failed to initialize display. Bot will start but display functions won't work.")
 
-    # Create the Application
-    application = Application.builder().token(token).build()
+    # Compile the dithering kernel now rather than on the first photo
+    warm_up_dither()
+
+    # Create the Application; updates are handled concurrently and the
+    # display itself is serialized by display_lock
+    application = Application.builder().token(token).concurrent_updates(True).build()
 
     # Add handlers
     application.add_handler(CommandHandler("start", start))